@@ -0,0 +1,439 @@
+import asyncio
+import os
+import time
+from functools import wraps
+from flask_login import AnonymousUserMixin
+from flask_mail import Message
+from flask_sqlalchemy.pagination import Pagination
+from jinja2 import FileSystemBytecodeCache
+from quart import Quart, render_template, request, redirect, url_for, flash, session, g, abort
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import NotFound, MethodNotAllowed
+from werkzeug.routing import Rule
+from werkzeug.utils import secure_filename
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from main import app as flask_app, mail
+from models import User, Laptop, Order, OrderItem, bump_orders_version
+from warmup import warmup_state, expect_async_warm_up, CATALOG_WARMUP_PAGES
+from routes import validate_product_form, order_email_items
+from inventory import status_change_stock_events, unavailable_items_message
+
+# Async serving mode. The catalog, product, cart and checkout handlers, plus the
+# admin handlers that send mail or save files (add_product, update_order_status),
+# run as coroutines on an aiosqlite engine; every other route falls through to the
+# synchronous Flask app on a thread pool. Serve with:
+#
+#     hypercorn async_app:asgi_app --bind 0.0.0.0:5000
+
+app = Quart(__name__)
+app.secret_key = flask_app.secret_key  # Share the Flask session cookie (cart, flashes, login)
+
+# Quart compiles templates in async mode, so its bytecode must not mix with the sync cache
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+    os.path.join(flask_app.config['JINJA_CACHE_DIR'], 'async'))
+os.makedirs(app.jinja_env.bytecode_cache.directory, exist_ok=True)
+
+engine = create_async_engine(
+    flask_app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite://', 'sqlite+aiosqlite://', 1))
+async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+# /readyz (served by the Flask app) waits for the async warm-up below as well
+expect_async_warm_up(flask_app)
+
+
+class LoadedPagination(Pagination):
+    """Flask-SQLAlchemy pagination over a page of items that was already fetched."""
+
+    def _query_items(self):
+        return self._query_args['items']
+
+    def _query_count(self):
+        return self._query_args['total']
+
+
+def login_required(view):
+    @wraps(view)
+    async def wrapped(*args, **kwargs):
+        if not g.current_user.is_authenticated:
+            await flash('Please log in to access this page.', 'message')
+            return redirect(url_for('login', next=request.path))
+        return await view(*args, **kwargs)
+    return wrapped
+
+
+async def send_mail(subject, recipients, html):
+    """Send mail through Flask-Mail on a worker thread so the event loop keeps serving."""
+    def _send():
+        with flask_app.app_context():
+            msg = Message(subject,
+                          sender=("LaptopSales", os.environ.get('MAIL_USERNAME')),
+                          recipients=recipients)
+            msg.html = html
+            mail.send(msg)
+    await asyncio.to_thread(_send)
+
+
+@app.before_request
+async def load_current_user():
+    # Flask-Login keeps the logged in user's id in the shared session
+    g.current_user = AnonymousUserMixin()
+    user_id = session.get('_user_id')
+    if user_id is not None:
+        async with async_session() as db_session:
+            user = await db_session.get(User, int(user_id))
+        if user:
+            g.current_user = user
+
+
+@app.context_processor
+def inject_current_user():
+    return dict(current_user=g.current_user)
+
+
+async def warm_up_async():
+    """Opens the aiosqlite pool and renders the main pages through the async handlers.
+
+    Quart compiles templates in async mode into its own bytecode cache, so the sync
+    warm-up in warmup.py does not cover them.
+    """
+    state = warmup_state(flask_app)
+    state['async_status'] = 'warming'
+    try:
+        start = time.perf_counter()
+        connections = []
+        try:
+            for _ in range(flask_app.config['WARMUP_POOL_CONNECTIONS']):
+                conn = await engine.connect()
+                await conn.execute(text('SELECT 1'))
+                connections.append(conn)
+        finally:
+            for conn in connections:
+                await conn.close()
+        state['steps']['async_open_pool'] = round((time.perf_counter() - start) * 1000, 2)
+
+        start = time.perf_counter()
+        paths = [f'/?page={page}' for page in range(1, CATALOG_WARMUP_PAGES + 1)]
+        async with async_session() as db_session:
+            laptop_id = await db_session.scalar(select(Laptop.id).order_by(Laptop.id.asc()).limit(1))
+        if laptop_id:
+            paths.append(f'/product/{laptop_id}')
+        client = app.test_client()
+        for path in paths:
+            response = await client.get(path)
+            if response.status_code >= 500:
+                raise RuntimeError(f"GET {path} returned {response.status_code}")
+        state['steps']['async_render_main_pages'] = round((time.perf_counter() - start) * 1000, 2)
+        state['async_status'] = 'ready'
+    except Exception as e:
+        app.logger.error(f"Async warm-up failed: {e}")
+        state['error'] = str(e)
+        state['async_status'] = 'failed'
+
+
+@app.before_serving
+async def start_async_warm_up():
+    if warmup_state(flask_app)['async_status'] == 'pending':
+        app.add_background_task(warm_up_async)
+
+
+@app.after_serving
+async def dispose_engine():
+    await engine.dispose()
+
+
+@app.route('/')
+async def index():
+    page = request.args.get('page', 1, type=int)
+    per_page = 6
+    search_query = request.args.get('search')
+    if search_query:
+        query = select(Laptop).filter(Laptop.brand.ilike(f'%{search_query}%'))
+    else:
+        # Same ordering as the sync catalog: promotions, then discounts, then by id
+        query = select(Laptop).order_by(
+            (Laptop.promotion.isnot(None) & (Laptop.promotion != '')).desc(),
+            (Laptop.discount > 0).desc(),
+            Laptop.id.asc()
+        )
+    page = max(page, 1)
+    async with async_session() as db_session:
+        laptops = (await db_session.scalars(query.limit(per_page).offset((page - 1) * per_page))).all()
+        total = await db_session.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+    laptops_pagination = LoadedPagination(page=page, per_page=per_page, error_out=False, items=laptops, total=total)
+    return await render_template('index.html', laptops=laptops, pagination=laptops_pagination)
+
+
+@app.route('/product/<int:laptop_id>')
+async def product(laptop_id):
+    async with async_session() as db_session:
+        laptop = await db_session.get(Laptop, laptop_id)
+    if laptop is None:
+        abort(404)
+    return await render_template('product.html', laptop=laptop)
+
+
+@app.route('/cart', methods=['GET', 'POST'])
+@login_required
+async def cart():
+    cart_items = session.get('cart', [])
+    for item in cart_items:
+        price = item.get('price', 0)
+        discount = item.get('discount', 0)
+        quantity = item.get('quantity', 1)
+        item['subtotal'] = price * quantity * (1 - discount / 100)
+    total = sum(item['subtotal'] for item in cart_items) if cart_items else 0
+    return await render_template('cart.html', cart_items=cart_items, total=total)
+
+
+@app.route('/add_to_cart/<int:laptop_id>', methods=['POST'])
+@login_required
+async def add_to_cart(laptop_id):
+    async with async_session() as db_session:
+        laptop = await db_session.get(Laptop, laptop_id)
+    if laptop is None:
+        abort(404)
+    cart = session.get('cart', [])
+
+    found_item = next((item for item in cart if item['id'] == laptop_id), None)
+    if found_item:
+        if laptop.stock > found_item['quantity']:
+            found_item['quantity'] += 1
+            await flash('Laptop quantity updated in cart!')
+        else:
+            await flash(f'Sorry, only {laptop.stock} of {laptop.brand} {laptop.model} available.', 'error')
+    else:
+        if laptop.stock > 0:
+            cart.append({
+                'id': laptop.id,
+                'brand': laptop.brand,
+                'model': laptop.model,
+                'specs': laptop.specs,
+                'price': laptop.price,
+                'discount': laptop.discount,
+                'quantity': 1,
+                'image': laptop.image
+            })
+            await flash('Laptop added to cart!')
+        else:
+            await flash(f'Sorry, {laptop.brand} {laptop.model} is out of stock.', 'error')
+
+    session['cart'] = cart
+    return redirect(url_for('cart'))
+
+
+@app.route('/remove_from_cart/<int:laptop_id>', methods=['POST'])
+async def remove_from_cart(laptop_id):
+    cart = session.get('cart', [])
+    session['cart'] = [item for item in cart if item['id'] != laptop_id]
+    await flash('Item removed from cart!')
+    return redirect(url_for('cart'))
+
+
+@app.route('/checkout', methods=['GET', 'POST'])
+@login_required
+async def checkout():
+    cart_items = session.get('cart', [])
+    if not cart_items:
+        await flash('Your cart is empty.')
+        return redirect(url_for('cart'))
+
+    grand_total = 0
+    for item in cart_items:
+        price = item.get('price', 0)
+        discount = item.get('discount', 0)
+        quantity = item.get('quantity', 1)
+        final_price = price * (1 - discount / 100)
+        item['subtotal'] = final_price * quantity
+        grand_total += item['subtotal']
+
+    if request.method == 'POST':
+        form = await request.form
+        customer_name = form.get('name')
+        shipping_address = form.get('address')
+        customer_email = form.get('email')
+        if not shipping_address:
+            await flash('Shipping address is required.', 'error')
+            return await render_template('checkout.html', cart_items=cart_items, total=grand_total)
+        if not customer_email:
+            await flash('Email address is required.', 'error')
+            return await render_template('checkout.html', cart_items=cart_items, total=grand_total)
+
+        async with async_session() as db_session:
+            new_order = Order(
+                user_id=g.current_user.id,
+                total_price=grand_total,
+                shipping_address=shipping_address,
+                status='Pending',
+                customer_email=customer_email
+            )
+            db_session.add(new_order)
+            await db_session.flush()  # Assigns new_order.id
+
+            try:
+                # Create OrderItems and update stock
+                for item in cart_items:
+                    laptop = await db_session.get(Laptop, item['id'])
+                    if laptop and laptop.stock >= item['quantity']:
+                        price_at_purchase = laptop.price * (1 - (laptop.discount or 0) / 100)
+                        db_session.add(OrderItem(
+                            order_id=new_order.id,
+                            laptop_id=item['id'],
+                            quantity=item['quantity'],
+                            price_at_purchase=price_at_purchase
+                        ))
+                        db_session.add(laptop.adjust_stock(-item['quantity'], 'sale', order_id=new_order.id))
+                    else:
+                        await flash(f"Sorry, {item['brand']} {item['model']} is out of stock.", 'error')
+                        await db_session.rollback()  # Rollback the order and any stock changes
+                        return redirect(url_for('cart'))
+
+                await db_session.execute(bump_orders_version(g.current_user.id))
+                await db_session.commit()
+            except StaleDataError:
+                # Stock changed concurrently (another sale or an admin edit)
+                await db_session.rollback()
+                await flash('Stock changed while placing your order. Please review your cart and try again.', 'error')
+                return redirect(url_for('cart'))
+
+        # Send confirmation email
+        try:
+            html = await render_template('order_confirmation_email.html', order=new_order, customer_name=customer_name, items=cart_items, total=grand_total)
+            await send_mail("Your Order Confirmation", [customer_email], html)
+            await flash('Your order has been placed and a confirmation email has been sent!', 'success')
+        except Exception as e:
+            app.logger.error(f"Failed to send email: {e}")
+            await flash('Your order has been placed, but we failed to send a confirmation email. Please contact support.', 'warning')
+
+        session['cart'] = []
+        return redirect(url_for('index'))
+
+    return await render_template('checkout.html', cart_items=cart_items, total=grand_total)
+
+
+@app.route('/add_product', methods=['GET', 'POST'])
+@login_required
+async def add_product():
+    if g.current_user.role != 'admin':
+        await flash('Admins only!')
+        return redirect(url_for('index'))
+    if request.method == 'POST':
+        form = await request.form
+        values, errors = validate_product_form(form)
+        if errors:
+            for error in errors:
+                await flash(error, 'error')
+            return await render_template('add_edit.html', laptop=form, action='Add', readonly=False)
+
+        # Quart's FileStorage.save writes through aiofiles, so the upload never blocks the loop
+        files = await request.files
+        image_file = files.get('image')
+        image_filename = None
+        if image_file and image_file.filename:
+            img_folder = os.path.join('static', 'images')
+            await asyncio.to_thread(os.makedirs, img_folder, exist_ok=True)
+            image_filename = secure_filename(image_file.filename)
+            await image_file.save(os.path.join(img_folder, image_filename))
+
+        stock = values.pop('stock')
+        async with async_session() as db_session:
+            laptop = Laptop(stock=0, image=image_filename, **values)
+            db_session.add(laptop)
+            # Opening stock goes through the inventory ledger like every other change
+            if stock:
+                db_session.add(laptop.adjust_stock(stock, 'restock'))
+            await db_session.commit()
+        await flash('Product added successfully!', 'success')
+        return redirect(url_for('index'))
+    return await render_template('add_edit.html', laptop=None, action='Add', readonly=False)
+
+
+@app.route('/admin/order/update_status/<int:order_id>', methods=['POST'])
+@login_required
+async def update_order_status(order_id):
+    if g.current_user.role != 'admin':
+        await flash('Admins only!', 'error')
+        return redirect(url_for('index'))
+
+    form = await request.form
+    new_status = form.get('status')
+    if new_status not in ['Pending', 'Confirmed', 'Shipped', 'Delivered', 'Cancelled']:
+        await flash('Invalid status update.', 'error')
+        return redirect(url_for('admin_orders'))
+
+    async with async_session() as db_session:
+        # Items, their laptops and the customer are needed for the stock change and the email
+        order = await db_session.scalar(select(Order).where(Order.id == order_id).options(
+            selectinload(Order.items).selectinload(OrderItem.laptop),
+            selectinload(Order.customer)
+        ))
+        if order is None:
+            abort(404)
+        old_status = order.status
+        try:
+            events, unavailable = status_change_stock_events(order, old_status, new_status)
+            if unavailable:
+                await flash(unavailable_items_message(order, unavailable), 'error')
+                return redirect(url_for('admin_orders'))
+            order.status = new_status
+            db_session.add_all(events)
+            await db_session.execute(bump_orders_version(order.user_id))
+            await db_session.commit()
+        except StaleDataError:
+            await db_session.rollback()
+            await flash(f'Stock for order #{order_id} changed concurrently. Please try again.', 'error')
+            return redirect(url_for('admin_orders'))
+
+    # Send email notification for status changes (use email from checkout, not login email)
+    if new_status in ['Confirmed', 'Shipped', 'Delivered', 'Cancelled'] and order.customer_email:
+        try:
+            html = await render_template('order_status_email.html',
+                                         order=order,
+                                         status=new_status,
+                                         items=order_email_items(order),
+                                         customer_name=order.customer.username)
+            await send_mail(f"Your Order #{order.id} - {new_status}", [order.customer_email], html)
+            await flash(f'Order #{order.id} status updated to {new_status} and email notification sent.', 'success')
+        except Exception as e:
+            app.logger.error(f"Failed to send email: {e}")
+            await flash(f'Order #{order.id} status updated to {new_status} but email notification failed.', 'warning')
+    else:
+        await flash(f'Order #{order.id} status updated to {new_status}.', 'success')
+    return redirect(url_for('admin_orders'))
+
+
+class ThreadPoolWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs WSGI apps with thread_sensitive=True: every request on one shared
+    # thread, so one slow sync route would stall all the others (including /readyz).
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False)
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that runs each request on the event loop's thread pool."""
+
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+# Let templates build URLs for the routes that stay on the sync app
+for rule in flask_app.url_map.iter_rules():
+    if rule.endpoint not in app.view_functions:
+        app.url_map.add(Rule(rule.rule, endpoint=rule.endpoint, methods=rule.methods, build_only=True))
+
+wsgi_fallback = ThreadPoolWsgiToAsgi(flask_app)
+
+
+async def asgi_app(scope, receive, send):
+    """Dispatch to the async handlers when they own the path, else to the Flask app."""
+    if scope['type'] == 'http':
+        adapter = app.url_map.bind('localhost')
+        try:
+            adapter.match(scope['path'], method=scope['method'])
+        except (NotFound, MethodNotAllowed):
+            return await wsgi_fallback(scope, receive, send)
+        except Exception:
+            pass  # Redirects and the like are handled by Quart itself
+    return await app(scope, receive, send)
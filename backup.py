@@ -0,0 +1,222 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Online snapshots of the SQLite database.
+#
+#   python backup.py snapshot                 full, gzip-compressed snapshot
+#   python backup.py snapshot --incremental   only pages changed since the latest snapshot
+#   python backup.py list
+#   python backup.py restore <snapshot_id>    verified restore into the live database
+#
+# Snapshots are taken with SQLite's online backup API in paced page batches, so
+# checkouts keep writing while a backup runs. Each snapshot is a JSON manifest
+# plus a gzip data file: the whole database image for a full snapshot, or only
+# the changed pages for an incremental one (which chains to its parent).
+
+load_dotenv()
+
+# Same default as main.py
+DEFAULT_DB_PATH = os.environ.get('DATABASE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'laptops.db'))
+DEFAULT_SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+PAGE_RECORD = struct.Struct('>I')  # Page number header in incremental data files
+
+
+def online_copy(src_path, dst_path, pages, sleep):
+    """Copies a live database with the backup API, `pages` at a time, pausing `sleep` seconds between batches."""
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dst_path)
+    try:
+        src.backup(dst, pages=pages, sleep=sleep)
+    finally:
+        dst.close()
+        src.close()
+
+
+def page_hashes(db_path):
+    """Returns the page size and a hash per page of a (quiescent) database file."""
+    conn = sqlite3.connect(db_path)
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    conn.close()
+    hashes = []
+    with open(db_path, 'rb') as f:
+        while True:
+            page = f.read(page_size)
+            if not page:
+                break
+            hashes.append(hashlib.sha1(page).hexdigest())
+    return page_size, hashes
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifests(snapshot_dir):
+    manifests = {}
+    if os.path.isdir(snapshot_dir):
+        for name in os.listdir(snapshot_dir):
+            if name.endswith('.json'):
+                with open(os.path.join(snapshot_dir, name)) as f:
+                    manifest = json.load(f)
+                manifests[manifest['id']] = manifest
+    return manifests
+
+
+def latest_manifest(snapshot_dir):
+    manifests = load_manifests(snapshot_dir)
+    if not manifests:
+        return None
+    return manifests[max(manifests, key=lambda snapshot_id: manifests[snapshot_id]['created_at'])]
+
+
+def snapshot(db_path, snapshot_dir, incremental=False, pages=256, sleep=0.01):
+    """Takes a full or incremental snapshot and returns its manifest."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    parent = latest_manifest(snapshot_dir) if incremental else None
+    if incremental and parent is None:
+        print("No previous snapshot found; taking a full snapshot instead.")
+
+    snapshot_id = datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = os.path.join(tmp, 'image.db')
+        online_copy(db_path, image_path, pages, sleep)
+        page_size, hashes = page_hashes(image_path)
+
+        if parent and parent['page_size'] == page_size:
+            data_file = f'{snapshot_id}.pages.gz'
+            changed = [i for i, h in enumerate(hashes)
+                       if i >= len(parent['page_hashes']) or parent['page_hashes'][i] != h]
+            with open(image_path, 'rb') as src, gzip.open(os.path.join(snapshot_dir, data_file), 'wb') as out:
+                for page_no in changed:
+                    src.seek(page_no * page_size)
+                    out.write(PAGE_RECORD.pack(page_no))
+                    out.write(src.read(page_size))
+            kind, parent_id = 'incremental', parent['id']
+        else:
+            data_file = f'{snapshot_id}.full.gz'
+            changed = range(len(hashes))
+            with open(image_path, 'rb') as src, gzip.open(os.path.join(snapshot_dir, data_file), 'wb') as out:
+                shutil.copyfileobj(src, out)
+            kind, parent_id = 'full', None
+
+        manifest = {
+            'id': snapshot_id,
+            'type': kind,
+            'parent': parent_id,
+            'created_at': datetime.utcnow().isoformat(),
+            'source': db_path,
+            'data_file': data_file,
+            'page_size': page_size,
+            'page_count': len(hashes),
+            'changed_pages': len(changed),
+            'sha256': file_sha256(image_path),
+            'page_hashes': hashes,
+        }
+    with open(os.path.join(snapshot_dir, f'{snapshot_id}.json'), 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def rebuild_image(snapshot_dir, snapshot_id, image_path):
+    """Rebuilds the database image of a snapshot by replaying its chain onto the base full snapshot."""
+    manifests = load_manifests(snapshot_dir)
+    if snapshot_id not in manifests:
+        raise ValueError(f"Unknown snapshot {snapshot_id}")
+    chain = []
+    manifest = manifests[snapshot_id]
+    while manifest:
+        chain.append(manifest)
+        manifest = manifests.get(manifest['parent']) if manifest['parent'] else None
+    if chain[-1]['type'] != 'full':
+        raise ValueError(f"Snapshot chain for {snapshot_id} is missing its full base snapshot")
+
+    with open(image_path, 'wb') as out, gzip.open(os.path.join(snapshot_dir, chain[-1]['data_file']), 'rb') as src:
+        shutil.copyfileobj(src, out)
+    with open(image_path, 'r+b') as out:
+        for manifest in reversed(chain[:-1]):
+            page_size = manifest['page_size']
+            with gzip.open(os.path.join(snapshot_dir, manifest['data_file']), 'rb') as src:
+                while True:
+                    header = src.read(PAGE_RECORD.size)
+                    if not header:
+                        break
+                    (page_no,) = PAGE_RECORD.unpack(header)
+                    out.seek(page_no * page_size)
+                    out.write(src.read(page_size))
+        target = chain[0]
+        out.truncate(target['page_count'] * target['page_size'])
+    return target
+
+
+def verify_image(image_path, manifest):
+    """Checks a rebuilt image against the snapshot's checksum and SQLite's integrity check."""
+    if file_sha256(image_path) != manifest['sha256']:
+        raise ValueError(f"Checksum mismatch for snapshot {manifest['id']}")
+    conn = sqlite3.connect(image_path)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        conn.close()
+    if result != 'ok':
+        raise ValueError(f"Integrity check failed for snapshot {manifest['id']}: {result}")
+
+
+def restore(snapshot_dir, snapshot_id, db_path, pages=256, sleep=0.01):
+    """Rebuilds and verifies a snapshot, then copies it into `db_path` with the backup API."""
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = os.path.join(tmp, 'image.db')
+        manifest = rebuild_image(snapshot_dir, snapshot_id, image_path)
+        verify_image(image_path, manifest)
+        # Copy through the backup API so a running app sees either the old or the restored database
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        online_copy(image_path, db_path, pages, sleep)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Online snapshot and restore of the SQLite database.')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='database file (default: DATABASE_PATH or ./laptops.db)')
+    parser.add_argument('--dir', default=DEFAULT_SNAPSHOT_DIR, help='snapshot directory (default: SNAPSHOT_DIR or ./snapshots)')
+    parser.add_argument('--pages', type=int, default=256, help='pages copied per backup step')
+    parser.add_argument('--sleep', type=float, default=0.01, help='seconds to pause between backup steps')
+    commands = parser.add_subparsers(dest='command', required=True)
+    snapshot_cmd = commands.add_parser('snapshot', help='take a snapshot')
+    snapshot_cmd.add_argument('--incremental', action='store_true', help='store only pages changed since the latest snapshot')
+    commands.add_parser('list', help='list snapshots')
+    restore_cmd = commands.add_parser('restore', help='verify a snapshot and restore it into the database')
+    restore_cmd.add_argument('snapshot_id')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'snapshot':
+            manifest = snapshot(args.db, args.dir, args.incremental, args.pages, args.sleep)
+            print(f"Snapshot {manifest['id']} ({manifest['type']}): {manifest['changed_pages']}/{manifest['page_count']} pages stored.")
+        elif args.command == 'list':
+            for manifest in sorted(load_manifests(args.dir).values(), key=lambda m: m['created_at']):
+                parent = f" <- {manifest['parent']}" if manifest['parent'] else ''
+                print(f"{manifest['id']}  {manifest['type']:<11} {manifest['changed_pages']:>6} pages{parent}")
+        elif args.command == 'restore':
+            manifest = restore(args.dir, args.snapshot_id, args.db, args.pages, args.sleep)
+            print(f"Restored snapshot {manifest['id']} into {args.db} (checksum and integrity verified).")
+    except (ValueError, sqlite3.Error, OSError) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Benchmark against a throwaway copy of the database (main seeds it from the
+# bundled laptops.db) and keep the background threads out of the measurements
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench-async-'), 'laptops.db')
+os.environ['WARMUP_ON_START'] = 'false'
+os.environ['LOW_STOCK_POLL_SECONDS'] = '0'
+
+from async_app import app as async_app
+from main import app as sync_app, mail
+from models import db, User, Laptop
+
+# Compare the sync Flask handlers against the async Quart handlers under the
+# same number of in-flight requests: a thread pool of CONCURRENCY workers for
+# the sync path (like a threaded WSGI worker), CONCURRENCY coroutines on one
+# loop for the async path.
+#
+#   catalog   GET catalog/search/product pages (CPU and SQLite bound)
+#   checkout  POST /checkout with MAIL_LATENCY seconds of simulated SMTP time
+REQUESTS = 300
+CONCURRENCY = 32
+MAIL_LATENCY = 0.05
+
+
+def simulated_send(msg):
+    time.sleep(MAIL_LATENCY)
+
+
+def prepare():
+    """Returns the catalog paths and a session cookie holding a logged-in user with one item in the cart."""
+    with sync_app.app_context():
+        # Plenty of stock so no checkout fails on the way
+        db.session.execute(db.update(Laptop).values(stock=REQUESTS * 10))
+        db.session.commit()
+        laptop = Laptop.query.order_by(Laptop.id.asc()).first()
+        user = User.query.filter_by(role='user').first() or User.query.first()
+        paths = ['/', '/?page=2', '/?search=dell', f'/product/{laptop.id}']
+        cart = [{'id': laptop.id, 'brand': laptop.brand, 'model': laptop.model, 'specs': laptop.specs,
+                 'price': laptop.price, 'discount': laptop.discount, 'quantity': 1, 'image': laptop.image}]
+        user_id = user.id
+
+    client = sync_app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+        sess['cart'] = cart
+    cookie = f"session={client.get_cookie('session').value}"
+    return paths, cookie
+
+
+def scenarios(paths, cookie):
+    checkout_form = {'name': 'Bench', 'address': '1 Bench Street', 'email': 'bench@example.com'}
+    return {
+        'catalog': lambda i: ('GET', paths[i % len(paths)], {}),
+        'checkout': lambda i: ('POST', '/checkout', {'data': checkout_form, 'headers': {'Cookie': cookie}}),
+    }
+
+
+def report(label, elapsed, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<18}{len(latencies) / elapsed:>10.0f} req/s"
+          f"{statistics.median(latencies) * 1000:>10.2f} ms p50{p99 * 1000:>10.2f} ms p99")
+
+
+def bench_sync(name, make_request):
+    def fetch(i):
+        method, path, kwargs = make_request(i)
+        # A client per request, so threads never share a cookie jar
+        client = sync_app.test_client(use_cookies=False)
+        start = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} returned {response.status_code}")
+        return elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        latencies = list(pool.map(fetch, range(REQUESTS)))
+    report(f'sync {name}', time.perf_counter() - start, latencies)
+
+
+async def bench_async(name, make_request):
+    limit = asyncio.Semaphore(CONCURRENCY)
+
+    # test_app() runs the serving lifecycle, so the async engine gets disposed
+    async with async_app.test_app() as test_app:
+        async def fetch(i):
+            method, path, kwargs = make_request(i)
+            if 'data' in kwargs:
+                kwargs = {'form': kwargs['data'], 'headers': kwargs['headers']}
+            client = test_app.test_client()
+            async with limit:
+                start = time.perf_counter()
+                response = await client.open(path, method=method, **kwargs)
+                elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {path} returned {response.status_code}")
+            return elapsed
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(fetch(i) for i in range(REQUESTS)))
+        report(f'async {name}', time.perf_counter() - start, latencies)
+
+
+if __name__ == '__main__':
+    mail.send = simulated_send
+    paths, cookie = prepare()
+    print(f"{REQUESTS} requests per run, {CONCURRENCY} in flight, {MAIL_LATENCY * 1000:.0f} ms simulated mail")
+    for name, make_request in scenarios(paths, cookie).items():
+        bench_sync(name, make_request)
+        asyncio.run(bench_async(name, make_request))
@@ -0,0 +1,94 @@
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from jinja2 import FileSystemBytecodeCache
+
+# Keep main's background threads from rendering and querying while cold timings are taken
+os.environ['WARMUP_ON_START'] = 'false'
+os.environ['LOW_STOCK_POLL_SECONDS'] = '0'
+
+from main import app
+from models import Laptop
+
+# Benchmark cold-start and steady-state render time per template.
+#   cold (no cache):  fresh environment, template compiled from source
+#   cold (bytecode):  fresh environment, template loaded from a warm bytecode cache
+#   steady:           median render time of an already loaded template
+STEADY_RUNS = 200
+
+sample_laptop = SimpleNamespace(
+    id=1, brand='Dell', model='XPS 13', specs='16GB RAM, 512GB SSD', price=1299.0,
+    discount=10, promotion='Back to school', image='dell.jpg', stock=5,
+    description='Thin and light laptop.'
+)
+sample_cart = [{
+    'id': 1, 'brand': 'Dell', 'model': 'XPS 13', 'specs': '16GB RAM, 512GB SSD',
+    'price': 1299.0, 'discount': 10, 'quantity': 2, 'image': 'dell.jpg', 'subtotal': 2338.2
+}]
+sample_order = SimpleNamespace(
+    id=1, total_price=2338.2, status='Shipped', order_date=datetime.utcnow(),
+    shipping_address='1 Main Street', customer_email='customer@example.com'
+)
+sample_items = [{'brand': 'Dell', 'model': 'XPS 13', 'quantity': 2, 'price': 1169.1, 'subtotal': 2338.2}]
+
+
+def template_contexts():
+    pagination = Laptop.query.order_by(Laptop.id.asc()).paginate(page=1, per_page=6, error_out=False)
+    return {
+        'index.html': dict(laptops=pagination.items, pagination=pagination),
+        'product.html': dict(laptop=sample_laptop),
+        'cart.html': dict(cart_items=sample_cart, total=2338.2),
+        'checkout.html': dict(cart_items=sample_cart, total=2338.2),
+        'login.html': dict(),
+        'register.html': dict(),
+        'add_edit.html': dict(laptop=sample_laptop, action='Update', readonly=False),
+        'order_confirmation_email.html': dict(order=sample_order, customer_name='Alice', items=sample_cart, total=2338.2),
+        'order_status_email.html': dict(order=sample_order, status='Shipped', items=sample_items, customer_name='Alice'),
+    }
+
+
+def fresh_env(bytecode_cache):
+    env = app.create_jinja_environment()
+    env.bytecode_cache = bytecode_cache
+    return env
+
+
+def time_first_render(env, name, context):
+    start = time.perf_counter()
+    env.get_template(name).render(context)
+    return time.perf_counter() - start
+
+
+def run():
+    with app.test_request_context('/'):
+        contexts = template_contexts()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = FileSystemBytecodeCache(cache_dir)
+            # Populate the bytecode cache once, like compile_templates.py does at build time
+            warm_env = fresh_env(cache)
+            for name in contexts:
+                warm_env.get_template(name)
+
+            print(f"{'template':<32}{'cold (no cache)':>18}{'cold (bytecode)':>18}{'steady':>12}")
+            for name, context in contexts.items():
+                context = dict(context)
+                app.update_template_context(context)
+                cold = time_first_render(fresh_env(None), name, context)
+                cold_cached = time_first_render(fresh_env(cache), name, context)
+
+                template = warm_env.get_template(name)
+                samples = []
+                for _ in range(STEADY_RUNS):
+                    start = time.perf_counter()
+                    template.render(context)
+                    samples.append(time.perf_counter() - start)
+                steady = statistics.median(samples)
+
+                print(f"{name:<32}{cold * 1000:>15.2f} ms{cold_cached * 1000:>15.2f} ms{steady * 1000:>9.3f} ms")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,23 @@
+import os
+from dotenv import load_dotenv
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache
+
+# Compile every template into the Jinja bytecode cache so workers start warm.
+# Run at build time (see Dockerfile) or after deploying template changes.
+#
+# This builds a bare Flask app with the same templates and cache directory as
+# main.py instead of importing it: importing main runs the database migrations
+# and starts the warm-up and low-stock threads.
+load_dotenv()
+
+app = Flask('main', root_path=os.path.dirname(os.path.abspath(__file__)))
+cache_dir = os.environ.get('JINJA_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache'))
+os.makedirs(cache_dir, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+template_names = app.jinja_env.list_templates()
+for name in template_names:
+    app.jinja_env.get_template(name)
+    print(f"Compiled {name}")
+print(f"{len(template_names)} templates cached in {cache_dir}.")
@@ -0,0 +1,65 @@
+import threading
+import time
+from models import db, InventoryEvent
+
+def status_change_stock_events(order, old_status, new_status):
+    """Returns the ledger events for an order status change, or the items that block it.
+
+    Cancelling returns the items to stock; reopening a cancelled order takes them again,
+    so every item must still exist and be in stock. Items whose product was deleted have
+    no stock to return. Expects order.items and each item's laptop to be loaded.
+    Returns (events, unavailable_items); events is empty when the change is blocked.
+    """
+    if new_status == 'Cancelled' and old_status != 'Cancelled':
+        return [item.laptop.adjust_stock(item.quantity, 'cancellation', order_id=order.id)
+                for item in order.items if item.laptop], []
+    if old_status == 'Cancelled' and new_status != 'Cancelled':
+        unavailable = [item for item in order.items if not item.laptop or item.laptop.stock < item.quantity]
+        if unavailable:
+            return [], unavailable
+        return [item.laptop.adjust_stock(-item.quantity, 'sale', order_id=order.id) for item in order.items], []
+    return [], []
+
+def unavailable_items_message(order, unavailable):
+    names = ', '.join(f'{item.laptop.brand} {item.laptop.model}' if item.laptop else f'deleted product #{item.laptop_id}'
+                      for item in unavailable)
+    return f'Order #{order.id} cannot be reopened: not enough stock for {names}.'
+
+def new_low_stock_events(after_id, threshold):
+    """Returns ledger events after `after_id` that took a laptop's stock down to `threshold` or below."""
+    events = InventoryEvent.query.filter(InventoryEvent.id > after_id).order_by(InventoryEvent.id).all()
+    crossed = [e for e in events if e.stock_after <= threshold < e.stock_after - e.change]
+    last_id = events[-1].id if events else after_id
+    return crossed, last_id
+
+def start_low_stock_monitor(app):
+    """Starts a daemon thread that tails the inventory ledger and logs low-stock alerts.
+
+    Only new ledger rows are read on each poll, so the cost does not grow with the catalog.
+    """
+    threshold = app.config['LOW_STOCK_THRESHOLD']
+    interval = app.config['LOW_STOCK_POLL_SECONDS']
+    if interval <= 0:
+        return None
+
+    with app.app_context():
+        last_id = db.session.query(db.func.max(InventoryEvent.id)).scalar() or 0
+
+    def watch():
+        nonlocal last_id
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    crossed, last_id = new_low_stock_events(last_id, threshold)
+                    for event in crossed:
+                        # The laptop may have been deleted since; its ledger rows stay behind
+                        name = f"{event.laptop.brand} {event.laptop.model} " if event.laptop else ''
+                        app.logger.warning(f"Low stock: {name}(id {event.laptop_id}) has {event.stock_after} "
+                                           f"left after {event.reason}.")
+            except Exception as e:
+                app.logger.error(f"Low-stock monitor failed: {e}")
+
+    thread = threading.Thread(target=watch, name='low-stock-monitor', daemon=True)
+    thread.start()
+    return thread
@@ -3,20 +3,32 @@ import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from models import db, User
+from models import db, User, Laptop, InventoryEvent
+from inventory import start_low_stock_monitor
+from warmup import start_warm_up
 import routes
 from dotenv import load_dotenv
 from flask_mail import Mail
+from jinja2 import FileSystemBytecodeCache
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'a_default_secret_key')
-# Use an absolute path for the database URI to ensure consistency
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(app.root_path, 'laptops.db')
+# Use an absolute path for the database URI to ensure consistency.
+# DATABASE_PATH lets the database live on fast local storage instead of the source tree.
+db_file_path = os.path.abspath(os.environ.get('DATABASE_PATH', os.path.join(app.root_path, 'laptops.db')))
+os.makedirs(os.path.dirname(db_file_path), exist_ok=True)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_file_path
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Persist compiled template bytecode so restarted workers skip Jinja compilation.
+# compile_templates.py fills this directory ahead of time at build.
+app.config['JINJA_CACHE_DIR'] = os.environ.get('JINJA_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache'))
+os.makedirs(app.config['JINJA_CACHE_DIR'], exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_CACHE_DIR'])
+
 # Flask-Mail configuration
 app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER')
 app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
@@ -24,6 +36,20 @@ app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'true').lower() in [
 app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 
+# Low-stock alerts. Every process that imports main would start its own monitor, so it
+# is off unless LOW_STOCK_MONITOR is set, and should be set for exactly one process.
+app.config['LOW_STOCK_MONITOR'] = os.environ.get('LOW_STOCK_MONITOR', 'false').lower() in ['true', 'on', '1']
+app.config['LOW_STOCK_THRESHOLD'] = int(os.environ.get('LOW_STOCK_THRESHOLD', 3))
+app.config['LOW_STOCK_POLL_SECONDS'] = int(os.environ.get('LOW_STOCK_POLL_SECONDS', 30))
+
+# Worker warm-up before /readyz reports ready
+app.config['WARMUP_ON_START'] = os.environ.get('WARMUP_ON_START', 'true').lower() in ['true', 'on', '1']
+app.config['WARMUP_POOL_CONNECTIONS'] = int(os.environ.get('WARMUP_POOL_CONNECTIONS', 5))
+
+# Per-worker cache of rendered order history pages
+app.config['ORDER_HISTORY_PER_PAGE'] = int(os.environ.get('ORDER_HISTORY_PER_PAGE', 10))
+app.config['ORDER_HISTORY_CACHE_SIZE'] = int(os.environ.get('ORDER_HISTORY_CACHE_SIZE', 1000))
+
 db.init_app(app)
 mail = Mail(app)  # Initialize Flask-Mail
 
@@ -52,6 +78,39 @@ def get_db_file_path(app):
         return db_file
     return None # Should not happen for sqlite:/// URIs
 
+def seed_database_from_bundled_copy():
+    """Copies the bundled laptops.db to DATABASE_PATH if nothing exists there yet (e.g. a fresh volume)."""
+    import sqlite3
+
+    bundled_path = os.path.join(app.root_path, 'laptops.db')
+    if os.path.exists(db_file_path) or not os.path.exists(bundled_path):
+        return
+
+    # Copy through the backup API into a temporary file, then hard-link it into place.
+    # The link fails if the target exists, so of several workers starting together
+    # exactly one seeds the database and none sees a partial or replaced file.
+    tmp_path = f"{db_file_path}.seed-{os.getpid()}"
+    src = dst = None
+    try:
+        src = sqlite3.connect(bundled_path)
+        dst = sqlite3.connect(tmp_path)
+        src.backup(dst)
+        dst.close()
+        dst = None
+        os.link(tmp_path, db_file_path)
+        print(f"Seeded {db_file_path} from bundled database {bundled_path}.")
+    except FileExistsError:
+        pass  # Another worker seeded it first
+    except sqlite3.Error as e:
+        print(f"Database error while seeding {db_file_path} from {bundled_path}: {e}")
+    finally:
+        if dst:
+            dst.close()
+        if src:
+            src.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def add_customer_email_column():
     """Adds the customer_email column to the order table if it doesn't exist."""
     import sqlite3
@@ -128,10 +187,116 @@ def add_is_deleted_column():
         if conn:
             conn.close()
 
+def add_laptop_version_column():
+    """Adds the version column (optimistic locking) to the laptop table if it doesn't exist.
+
+    Returns True when the column was added, i.e. the database predates the inventory ledger.
+    """
+    import sqlite3
+
+    db_path = get_db_file_path(app) # Use the consistent path
+    if not db_path:
+        print("Could not determine database file path from SQLALCHEMY_DATABASE_URI.")
+        return False
+
+    added = False
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Check if the 'laptop' table exists
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='laptop';")
+        if cursor.fetchone():
+            # Check if 'version' column exists in 'laptop' table
+            cursor.execute("PRAGMA table_info(laptop)")
+            columns = [col[1] for col in cursor.fetchall()]
+
+            if 'version' not in columns:
+                cursor.execute("ALTER TABLE laptop ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+                conn.commit()
+                added = True
+                print(f"Successfully added 'version' column to the 'laptop' table in {db_path}.")
+            else:
+                print(f"'version' column already exists in the 'laptop' table in {db_path}.")
+        else:
+            print(f"'laptop' table does not exist yet in {db_path}. It will be created by db.create_all().")
+
+    except sqlite3.Error as e:
+        print(f"Database error during migration check for {db_path}: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred during migration check for {db_path}: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return added
+
+def add_opening_stock_events():
+    """Records each laptop's current stock as an opening 'adjustment' row in the inventory ledger."""
+    laptops = Laptop.query.all()
+    db.session.add_all(InventoryEvent(laptop_id=laptop.id, change=laptop.stock, reason='adjustment',
+                                      stock_after=laptop.stock) for laptop in laptops)
+    db.session.commit()
+    print(f"Recorded opening stock for {len(laptops)} laptops in the inventory ledger.")
+
+def add_order_history_schema():
+    """Adds the user.orders_version column and the order history index if they don't exist."""
+    import sqlite3
+
+    db_path = get_db_file_path(app) # Use the consistent path
+    if not db_path:
+        print("Could not determine database file path from SQLALCHEMY_DATABASE_URI.")
+        return
+
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Check if the 'user' table exists
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='user';")
+        if cursor.fetchone():
+            # Check if 'orders_version' column exists in 'user' table
+            cursor.execute("PRAGMA table_info(user)")
+            columns = [col[1] for col in cursor.fetchall()]
+
+            if 'orders_version' not in columns:
+                cursor.execute("ALTER TABLE user ADD COLUMN orders_version INTEGER NOT NULL DEFAULT 0")
+                conn.commit()
+                print(f"Successfully added 'orders_version' column to the 'user' table in {db_path}.")
+            else:
+                print(f"'orders_version' column already exists in the 'user' table in {db_path}.")
+
+        # Check if the 'order' table exists; create_all() does not add indexes to existing tables
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='order';")
+        if cursor.fetchone():
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_order_user_id_order_date_id ON \"order\" (user_id, order_date, id)")
+            conn.commit()
+        else:
+            print(f"'order' table does not exist yet in {db_path}. It will be created by db.create_all().")
+
+    except sqlite3.Error as e:
+        print(f"Database error during migration check for {db_path}: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred during migration check for {db_path}: {e}")
+    finally:
+        if conn:
+            conn.close()
+
 with app.app_context():
+    seed_database_from_bundled_copy()
     add_customer_email_column()
     add_is_deleted_column()
+    ledger_is_new = add_laptop_version_column()
+    add_order_history_schema()
     db.create_all()
+    # Existing stock predates the ledger, so give each laptop an opening balance
+    if ledger_is_new:
+        add_opening_stock_events()
+
+if app.config['LOW_STOCK_MONITOR']:
+    start_low_stock_monitor(app)
+start_warm_up(app)
 
 if __name__ == '__main__':
      app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
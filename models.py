@@ -60,10 +60,15 @@ class User(db.Model, UserMixin):
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(10), nullable=False, default='user')  # 'user' or 'admin'
     orders = db.relationship('Order', backref='customer', lazy=True)
+    orders_version = db.Column(db.Integer, nullable=False, default=0)  # Bumped whenever this user's orders change
 
     def __repr__(self):
         return f'<User {self.username}>'
 
+def bump_orders_version(user_id):
+    """Returns an UPDATE that invalidates the user's cached order history pages"""
+    return db.update(User).where(User.id == user_id).values(orders_version=User.orders_version + 1)
+
 class Laptop(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     brand = db.Column(db.String(80), nullable=False)
@@ -73,12 +78,34 @@ class Laptop(db.Model):
     discount = db.Column(db.Float, default=0)
     promotion = db.Column(db.String(120))
     image = db.Column(db.String(120))
-    stock = db.Column(db.Integer, default=0)
+    stock = db.Column(db.Integer, default=0)  # Materialized from the InventoryEvent ledger
     description = db.Column(db.Text)
+    version = db.Column(db.Integer, nullable=False, default=1)  # Optimistic lock, bumped on every update
+
+    __mapper_args__ = {'version_id_col': version}
+
+    def adjust_stock(self, change, reason, order_id=None):
+        """Apply a stock change and return the ledger entry recording it (caller adds it to the session)"""
+        self.stock = (self.stock or 0) + change
+        return InventoryEvent(laptop=self, change=change, reason=reason, order_id=order_id, stock_after=self.stock)
 
     def __repr__(self):
         return f'<Laptop {self.brand} {self.model}>'
 
+class InventoryEvent(db.Model):
+    """Append-only stock ledger; rows are never updated or deleted."""
+    id = db.Column(db.Integer, primary_key=True)
+    laptop_id = db.Column(db.Integer, db.ForeignKey('laptop.id'), nullable=False)
+    change = db.Column(db.Integer, nullable=False)  # Signed quantity, negative for sales
+    reason = db.Column(db.String(20), nullable=False)  # sale, restock, adjustment, cancellation
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'))
+    stock_after = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    laptop = db.relationship('Laptop')
+
+    def __repr__(self):
+        return f'<InventoryEvent {self.reason} {self.change:+d} laptop={self.laptop_id}>'
+
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -90,6 +117,9 @@ class Order(db.Model):
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade="all, delete-orphan")
     is_deleted = db.Column(db.Boolean, default=False)  # Soft delete flag
 
+    # Serves the per-user order history, newest first
+    __table_args__ = (db.Index('ix_order_user_id_order_date_id', 'user_id', 'order_date', 'id'),)
+
     def __repr__(self):
         return f'<Order {self.id}>'
 
@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy.orm import selectinload
+from models import Order, OrderItem
+
+def encode_cursor(order):
+    return f"{order.order_date.isoformat()}_{order.id}"
+
+def decode_cursor(cursor):
+    """Parses a cursor into (order_date, id); raises ValueError if it is malformed."""
+    order_date, order_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(order_date), int(order_id)
+
+def order_history_page(user_id, cursor=None, per_page=10):
+    """Returns one page of a user's orders, newest first, and the cursor for the next page.
+
+    Pages are keyed on (order_date, id) so each page is an index range scan, and the
+    items and their laptops for the whole page are loaded in one batched query.
+    """
+    query = Order.query.filter(Order.user_id == user_id, Order.is_deleted.isnot(True))
+    if cursor:
+        order_date, order_id = decode_cursor(cursor)
+        query = query.filter((Order.order_date < order_date) |
+                             ((Order.order_date == order_date) & (Order.id < order_id)))
+    orders = query.options(
+        selectinload(Order.items).joinedload(OrderItem.laptop)
+    ).order_by(Order.order_date.desc(), Order.id.desc()).limit(per_page + 1).all()
+    next_cursor = encode_cursor(orders[per_page - 1]) if len(orders) > per_page else None
+    return orders[:per_page], next_cursor
+
+class RenderedPageCache:
+    """Small thread-safe LRU of rendered pages.
+
+    Keys include the user's orders_version, so bumping it (see models.bump_orders_version)
+    invalidates that user's pages on every worker; stale entries simply age out.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def set(self, key, page):
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
@@ -1,17 +1,87 @@
 import os
 import re
-from flask import render_template, request, redirect, url_for, flash, send_from_directory, abort
+from flask import render_template, request, redirect, url_for, flash, send_from_directory, abort, jsonify
 from flask_login import login_user, logout_user, current_user, login_required
 from flask_mail import Message
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from models import db, User, Laptop, Order, OrderItem
+from sqlalchemy.orm.exc import StaleDataError
+from markupsafe import Markup
+from models import db, User, Laptop, Order, OrderItem, bump_orders_version
+from order_history import order_history_page, RenderedPageCache
+from warmup import warmup_state, is_ready
+from inventory import status_change_stock_events, unavailable_items_message
 from flask import session
 
 def is_valid_email(email):
     return re.match(r"[^@]+@[^@]+\.[^@]+", email)
 
+def validate_product_form(form):
+    """Validates the add product form; returns the cleaned field values and a list of errors."""
+    # Enhanced validation
+    errors = []
+    
+    brand = form.get('brand', '').strip()
+    model = form.get('model', '').strip()
+    specs = form.get('specs', '').strip()
+    
+    if not brand:
+        errors.append('Brand is required')
+    if not model:
+        errors.append('Model is required')
+    if not specs:
+        errors.append('Specs are required')
+    
+    # Price validation
+    try:
+        price_str = form.get('price', '0').strip()
+        price = float(price_str) if price_str else 0.0
+        if price <= 0:
+            errors.append('Price must be greater than 0')
+    except (ValueError, TypeError):
+        errors.append('Invalid price format')
+        price = 0.0
+    
+    # Discount validation
+    try:
+        discount_str = form.get('discount', '0').strip()
+        discount = float(discount_str) if discount_str else 0.0
+        if discount < 0 or discount > 100:
+            errors.append('Discount must be between 0 and 100')
+    except (ValueError, TypeError):
+        errors.append('Invalid discount format')
+        discount = 0.0
+    
+    # Stock validation
+    try:
+        stock_str = form.get('stock', '0').strip()
+        stock = int(stock_str) if stock_str else 0
+        if stock < 0:
+            errors.append('Stock cannot be negative')
+    except (ValueError, TypeError):
+        errors.append('Invalid stock format')
+        stock = 0
+    
+    promotion = form.get('promotion', '').strip()
+    description = form.get('description', '').strip()
+    
+    values = dict(brand=brand, model=model, specs=specs, price=price, discount=discount,
+                  stock=stock, promotion=promotion, description=description)
+    return values, errors
+
+def order_email_items(order):
+    """Order items as plain dicts for the order status email."""
+    return [{
+        'brand': item.laptop.brand if item.laptop else 'Removed product',
+        'model': item.laptop.model if item.laptop else '',
+        'quantity': item.quantity,
+        'price': item.price_at_purchase,
+        'subtotal': item.price_at_purchase * item.quantity
+    } for item in order.items]
+
 def register_routes(app, mail):
+    order_history_cache = RenderedPageCache(app.config['ORDER_HISTORY_CACHE_SIZE'])
+
     @app.route('/')
     def index():
         page = request.args.get('page', 1, type=int)
@@ -46,21 +116,10 @@ def register_routes(app, mail):
                           sender=("LaptopSales", os.environ.get('MAIL_USERNAME')),
                           recipients=[customer_email])
             
-            # Get order items for email
-            order_items = []
-            for item in order.items:
-                order_items.append({
-                    'brand': item.laptop.brand,
-                    'model': item.laptop.model,
-                    'quantity': item.quantity,
-                    'price': item.price_at_purchase,
-                    'subtotal': item.price_at_purchase * item.quantity
-                })
-            
             msg.html = render_template('order_status_email.html', 
                                      order=order, 
                                      status=status,
-                                     items=order_items,
+                                     items=order_email_items(order),
                                      customer_name=order.customer.username)
             mail.send(msg)
             return True
@@ -75,52 +134,7 @@ def register_routes(app, mail):
             flash('Admins only!')
             return redirect(url_for('index'))
         if request.method == 'POST':
-            # Enhanced validation
-            errors = []
-            
-            brand = request.form.get('brand', '').strip()
-            model = request.form.get('model', '').strip()
-            specs = request.form.get('specs', '').strip()
-            
-            if not brand:
-                errors.append('Brand is required')
-            if not model:
-                errors.append('Model is required')
-            if not specs:
-                errors.append('Specs are required')
-            
-            # Price validation
-            try:
-                price_str = request.form.get('price', '0').strip()
-                price = float(price_str) if price_str else 0.0
-                if price <= 0:
-                    errors.append('Price must be greater than 0')
-            except (ValueError, TypeError):
-                errors.append('Invalid price format')
-                price = 0.0
-            
-            # Discount validation
-            try:
-                discount_str = request.form.get('discount', '0').strip()
-                discount = float(discount_str) if discount_str else 0.0
-                if discount < 0 or discount > 100:
-                    errors.append('Discount must be between 0 and 100')
-            except (ValueError, TypeError):
-                errors.append('Invalid discount format')
-                discount = 0.0
-            
-            # Stock validation
-            try:
-                stock_str = request.form.get('stock', '0').strip()
-                stock = int(stock_str) if stock_str else 0
-                if stock < 0:
-                    errors.append('Stock cannot be negative')
-            except (ValueError, TypeError):
-                errors.append('Invalid stock format')
-                stock = 0
-            
-            promotion = request.form.get('promotion', '').strip()
-            description = request.form.get('description', '').strip()
+            values, errors = validate_product_form(request.form)
             
             if errors:
                 for error in errors:
@@ -136,12 +150,12 @@ def register_routes(app, mail):
                 image_filename = secure_filename(image_file.filename)
                 image_file.save(os.path.join(img_folder, image_filename))
             
-            laptop = Laptop(
-                brand=brand, model=model, specs=specs, price=price,
-                discount=discount, promotion=promotion, stock=stock,
-                description=description, image=image_filename
-            )
+            stock = values.pop('stock')
+            laptop = Laptop(stock=0, image=image_filename, **values)
             db.session.add(laptop)
+            # Opening stock goes through the inventory ledger like every other change
+            if stock:
+                db.session.add(laptop.adjust_stock(stock, 'restock'))
             db.session.commit()
             flash('Product added successfully!', 'success')
             return redirect(url_for('index'))
@@ -199,6 +213,10 @@ def register_routes(app, mail):
                 errors.append('Invalid stock format')
                 stock = 0
             
+            # Reject edits made against a stale copy (e.g. a sale happened since the form was opened)
+            if request.form.get('version', type=int) != laptop.version:
+                errors.append('This product was changed by someone else while you were editing. Please review the current values and try again.')
+            
             if errors:
                 for error in errors:
                     flash(error, 'error')
@@ -210,7 +228,10 @@ def register_routes(app, mail):
             laptop.specs = specs
             laptop.price = price
             laptop.discount = discount
-            laptop.stock = stock
+            # Record the stock difference in the ledger instead of overwriting the counter
+            if stock != laptop.stock:
+                change = stock - (laptop.stock or 0)
+                db.session.add(laptop.adjust_stock(change, 'restock' if change > 0 else 'adjustment'))
             laptop.promotion = request.form.get('promotion', '').strip()
             laptop.description = request.form.get('description', '').strip()
             
@@ -223,7 +244,12 @@ def register_routes(app, mail):
                 image_file.save(os.path.join(img_folder, image_filename))
                 laptop.image = image_filename
             
-            db.session.commit()
+            try:
+                db.session.commit()
+            except StaleDataError:
+                db.session.rollback()
+                flash('This product was changed by someone else while you were editing. Please try again.', 'error')
+                return redirect(url_for('edit_product', laptop_id=laptop_id))
             flash('Product updated successfully!', 'success')
             return redirect(url_for('product', laptop_id=laptop.id))
         return render_template('add_edit.html', laptop=laptop, action='Update', readonly=False)
@@ -293,31 +319,38 @@ def register_routes(app, mail):
                 customer_email=customer_email  # Store the email from checkout
             )
             db.session.add(new_order)
-            db.session.commit() # Commit to get the new_order.id
-
-            # Create OrderItems and update stock
-            for item in cart_items:
-                laptop = Laptop.query.get(item['id'])
-                if laptop and laptop.stock >= item['quantity']:
-                    price_at_purchase = laptop.price * (1 - (laptop.discount or 0) / 100)
-                    
-                    order_item = OrderItem(
-                        order_id=new_order.id,
-                        laptop_id=item['id'],
-                        quantity=item['quantity'],
-                        price_at_purchase=price_at_purchase
-                    )
-                    db.session.add(order_item)
-                    
-                    # Decrement stock
-                    laptop.stock -= item['quantity']
-                else:
-                    # Not enough stock, this is a simplified handling.
-                    flash(f"Sorry, {item['brand']} {item['model']} is out of stock.", 'error')
-                    db.session.rollback() # Rollback the transaction
-                    return redirect(url_for('cart'))
+            db.session.flush() # Assigns new_order.id; the order commits together with its items
 
-            db.session.commit()
+            try:
+                # Create OrderItems and update stock
+                for item in cart_items:
+                    laptop = Laptop.query.get(item['id'])
+                    if laptop and laptop.stock >= item['quantity']:
+                        price_at_purchase = laptop.price * (1 - (laptop.discount or 0) / 100)
+                        
+                        order_item = OrderItem(
+                            order_id=new_order.id,
+                            laptop_id=item['id'],
+                            quantity=item['quantity'],
+                            price_at_purchase=price_at_purchase
+                        )
+                        db.session.add(order_item)
+                        
+                        # Decrement stock through the inventory ledger
+                        db.session.add(laptop.adjust_stock(-item['quantity'], 'sale', order_id=new_order.id))
+                    else:
+                        # Not enough stock, this is a simplified handling.
+                        flash(f"Sorry, {item['brand']} {item['model']} is out of stock.", 'error')
+                        db.session.rollback() # Rollback the order and any stock changes
+                        return redirect(url_for('cart'))
+
+                db.session.execute(bump_orders_version(current_user.id))
+                db.session.commit()
+            except StaleDataError:
+                # Stock changed concurrently (another sale or an admin edit)
+                db.session.rollback()
+                flash('Stock changed while placing your order. Please review your cart and try again.', 'error')
+                return redirect(url_for('cart'))
 
             # Send confirmation email
             try:
@@ -372,8 +405,19 @@ def register_routes(app, mail):
 
         if new_status in ['Pending', 'Confirmed', 'Shipped', 'Delivered', 'Cancelled']:
             old_status = order.status
-            order.status = new_status
-            db.session.commit()
+            try:
+                events, unavailable = status_change_stock_events(order, old_status, new_status)
+                if unavailable:
+                    flash(unavailable_items_message(order, unavailable), 'error')
+                    return redirect(url_for('admin_orders'))
+                order.status = new_status
+                db.session.add_all(events)
+                db.session.execute(bump_orders_version(order.user_id))
+                db.session.commit()
+            except StaleDataError:
+                db.session.rollback()
+                flash(f'Stock for order #{order_id} changed concurrently. Please try again.', 'error')
+                return redirect(url_for('admin_orders'))
             
             # Send email notification for status changes
             if new_status in ['Confirmed', 'Shipped', 'Delivered', 'Cancelled']:
@@ -404,11 +448,64 @@ def register_routes(app, mail):
         
         # Soft delete - mark as deleted instead of removing from database
         order.is_deleted = True
+        db.session.execute(bump_orders_version(order.user_id))
         db.session.commit()
         
         flash(f'Order #{order.id} has been soft deleted.', 'success')
         return redirect(url_for('admin_orders'))
 
+    @app.route('/my/orders')
+    @login_required
+    def my_orders():
+        cursor = request.args.get('cursor')
+        # The key changes whenever checkout or an admin touches this user's orders
+        cache_key = (current_user.id, current_user.orders_version, cursor)
+        orders_html = order_history_cache.get(cache_key)
+        if orders_html is None:
+            try:
+                orders, next_cursor = order_history_page(current_user.id, cursor, app.config['ORDER_HISTORY_PER_PAGE'])
+            except ValueError:
+                abort(400)
+            orders_html = Markup(render_template('my_orders_list.html', orders=orders, cursor=cursor, next_cursor=next_cursor))
+            order_history_cache.set(cache_key, orders_html)
+        return render_template('my_orders.html', orders_html=orders_html)
+
+    @app.route('/api/my/orders')
+    @login_required
+    def api_my_orders():
+        try:
+            orders, next_cursor = order_history_page(current_user.id, request.args.get('cursor'), app.config['ORDER_HISTORY_PER_PAGE'])
+        except ValueError:
+            return jsonify(error='Invalid cursor'), 400
+        return jsonify(
+            orders=[{
+                'id': order.id,
+                'order_date': order.order_date.isoformat(),
+                'status': order.status,
+                'total_price': order.total_price,
+                'shipping_address': order.shipping_address,
+                'items': [{
+                    'laptop_id': item.laptop_id,
+                    'brand': item.laptop.brand if item.laptop else None,
+                    'model': item.laptop.model if item.laptop else None,
+                    'quantity': item.quantity,
+                    'price_at_purchase': item.price_at_purchase,
+                } for item in order.items],
+            } for order in orders],
+            next_cursor=next_cursor,
+        )
+
+    @app.route('/healthz')
+    def healthz():
+        # Liveness: the process is up and serving, warm or not
+        return jsonify(status='alive', warmup=warmup_state(app)['status'])
+
+    @app.route('/readyz')
+    def readyz():
+        # Readiness: only route traffic here once warm-up has finished
+        state = warmup_state(app)
+        return jsonify(state), 200 if is_ready(state) else 503
+
     @app.route('/login', methods=['GET', 'POST'])
     def login():
         if request.method == 'POST':
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+from models import db, Laptop
+
+CATALOG_WARMUP_PAGES = 3
+
+def warmup_state(app):
+    return app.extensions.setdefault('warmup', {
+        'status': 'pending',  # pending -> warming -> ready | failed
+        'started_at': None,
+        'finished_at': None,
+        'steps': {},  # step name -> duration in ms
+        'error': None,
+    })
+
+def expect_async_warm_up(app):
+    """Marks that the async serving stack (async_app.py) must also warm up before the worker is ready."""
+    warmup_state(app)['async_status'] = 'pending' if app.config['WARMUP_ON_START'] else 'ready'
+
+def is_ready(state):
+    """Ready once the sync warm-up and, when serving async, the async warm-up have both finished."""
+    return state['status'] == 'ready' and state.get('async_status', 'ready') == 'ready'
+
+def _configure_mappers(app):
+    configure_mappers()
+
+def _open_pool(app):
+    # Check out several connections at once so the pool holds them open afterwards
+    connections = []
+    try:
+        for _ in range(app.config['WARMUP_POOL_CONNECTIONS']):
+            conn = db.engine.connect()
+            conn.execute(text('SELECT 1'))
+            connections.append(conn)
+    finally:
+        for conn in connections:
+            conn.close()
+
+def _touch_db_pages(app):
+    # Read the database file once so its pages are in the OS page cache
+    db_path = db.engine.url.database
+    if db_path and os.path.exists(db_path):
+        with open(db_path, 'rb') as f:
+            while f.read(1024 * 1024):
+                pass
+
+def _render_main_pages(app):
+    # Real requests compile index.html/product.html/base.html and prefetch the first catalog pages
+    client = app.test_client()
+    paths = [f'/?page={page}' for page in range(1, CATALOG_WARMUP_PAGES + 1)]
+    laptop = Laptop.query.order_by(Laptop.id.asc()).first()
+    if laptop:
+        paths.append(f'/product/{laptop.id}')
+    for path in paths:
+        response = client.get(path)
+        if response.status_code >= 500:
+            raise RuntimeError(f"GET {path} returned {response.status_code}")
+
+WARMUP_STEPS = [
+    ('configure_mappers', _configure_mappers),
+    ('open_pool', _open_pool),
+    ('touch_db_pages', _touch_db_pages),
+    ('render_main_pages', _render_main_pages),
+]
+
+def warm_up(app):
+    """Runs every warm-up step in order, recording timings in the warm-up state."""
+    state = warmup_state(app)
+    state['status'] = 'warming'
+    state['started_at'] = datetime.utcnow().isoformat()
+    try:
+        with app.app_context():
+            for name, step in WARMUP_STEPS:
+                start = time.perf_counter()
+                step(app)
+                state['steps'][name] = round((time.perf_counter() - start) * 1000, 2)
+        state['status'] = 'ready'
+    except Exception as e:
+        app.logger.error(f"Worker warm-up failed: {e}")
+        state['error'] = str(e)
+        state['status'] = 'failed'
+    finally:
+        state['finished_at'] = datetime.utcnow().isoformat()
+
+def start_warm_up(app):
+    """Warms the worker on a background thread; /readyz reports 503 until it finishes."""
+    state = warmup_state(app)
+    if not app.config['WARMUP_ON_START']:
+        state['status'] = 'ready'
+        return None
+    thread = threading.Thread(target=warm_up, args=(app,), name='warm-up', daemon=True)
+    thread.start()
+    return thread